@@ -4,33 +4,195 @@
 # This file is distributed under Public Domain.
 # Hosted at https://github.com/tos-kamiya/pager-with-less-like-key-binding .
 
+from array import array
+from bisect import bisect_left, bisect_right
+import codecs
 from collections import namedtuple
 import curses
+import locale
+import mmap
+import os
+import re
 import sys
-import traceback
+import threading
+import unicodedata
+
+try:
+    from typing import Any, List  # for type comments, used by mypy/mypyc only
+except ImportError:
+    pass
 
 
 YX = namedtuple('YX', ('y', 'x'))
 
+_SEARCH_CHUNK = 1 << 20  # bytes scanned by a find call of background search
+_INDEX_FIRST_CHUNK = 1 << 16  # bytes of the file head, of which lines are indexed before showing
+_INDEX_CHUNK = 1 << 20  # bytes split into lines at a time by index_lines
+
+# maps control chars except tab and newline to '?', as e.g. '\r' or '\b' would move the cursor,
+# and DEL to '?', as it would be shown as '^?' in two columns
+_CTRL_TABLE = bytes(bytearray(c if 32 <= c != 127 or c in (9, 10) else ord(b'?') for c in range(256)))
+
+# DEC private mode 2026, which lets a terminal show the output between the two as a single update.
+# a terminal not supporting it ignores them.
+_SYNC_BEGIN = b'\x1b[?2026h'
+_SYNC_END = b'\x1b[?2026l'
+
+# key codes and chars compared at run time
+_ORD_N = ord(b'n')
+_ORD_SLASH = ord(b'/')
+_ORD_SPACE = ord(b' ')
+
+
+class LineView(object):
+    __slots__ = ('buf', 'starts', 'indexed')
+
+    def __init__(self, buf, starts=None):
+        self.buf = buf  # bytes or mmap
+        self.starts = [0] if starts is None else starts
+                # list of int, offsets of the lines in buf, followed by the end of the last line when indexed
+        self.indexed = threading.Event()  # set when starts covers whole buf
+        if starts is not None:
+            self.indexed.set()
+
+    def __len__(self):
+        return len(self.starts) - 1  # the lines indexed so far
+
+    def __getitem__(self, i):
+        return self.buf[self.starts[i]:self.starts[i + 1]]
+
+    def get_head(self, i, length):
+        # type: (int, int) -> bytes
+        starts = self.starts
+        start, end = starts[i], starts[i + 1]
+        stop = start + length
+        return self.buf[start:stop if stop < end else end]
+
+
+def index_lines(content, stop):
+    # type: (LineView, int) -> None
+    buf, starts = content.buf, content.starts
+    append = starts.append
+    pos = starts[-1]
+    while pos < stop:
+        end = buf.rfind(b'\n', pos, min(stop, pos + _INDEX_CHUNK))
+        if end < 0:
+            end = buf.find(b'\n', pos + _INDEX_CHUNK, stop)  # a line longer than a chunk
+            if end < 0:
+                break  # while
+        # split a chunk at newlines in C, which is faster than finding the newlines one by one
+        p = pos
+        for line in buf[pos:end].split(b'\n'):
+            p += len(line) + 1
+            append(p)
+        pos = end + 1
+    if stop >= len(buf):
+        if starts[-1] != len(buf):
+            starts.append(len(buf))  # the last line does not end with a newline
+        content.indexed.set()
+
+
+def load_content(input_file):
+    with open(input_file, 'rb') as inp:
+        try:
+            buf = mmap.mmap(inp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):  # an empty file or a file that can not be mapped
+            buf = inp.read()
+    content = LineView(buf)
+
+    # index the head of file here to show the first page, and the rest in background
+    index_lines(content, min(len(buf), _INDEX_FIRST_CHUNK))
+    if not content.indexed.is_set():
+        t = threading.Thread(target=index_lines, args=(content, len(buf)))
+        t.daemon = True
+        t.start()
+    return content
+
+
+class MatchCache(object):
+    __slots__ = ('offsets', 'rows', 'scanned_end', 'scanner')
+
+    def __init__(self):
+        self.offsets = {}  # row -> list of match offsets, only for the rows visited by n/N and having a match
+        self.rows = array('l')  # rows having a match, in ascending order, filled by a background scan
+        self.scanned_end = 0  # rows before this row are all scanned, and are in rows if having a match
+        self.scanner = None  # the thread filling rows, the only one which may update rows and scanned_end
+
+
+_ASCII_NO_TAB = re.compile(b'^[^\t\x80-\xff]*$')  # text of which each byte takes a column
+_UNCTRL_WIDTHS = {}  # byte -> columns taken by the byte, when curses can not decode it
+
+
+def _escape_bytes(err):
+    # a decode error handler, which maps each undecodable byte to U+DC80..U+DCFF, as surrogateescape of Python 3
+    return u''.join(u'%c' % (0xdc00 + b) for b in bytearray(err.object[err.start:err.end])), err.end
+
 
-class Index:
-    def __init__(self, size):
-        self._pos = 0  # 0 <= _pos < size  (if size > 0)
-        self._size = size
+codecs.register_error('plk_escape', _escape_bytes)
 
-    def _get_pos(self):
-        return self._pos
-    pos = property(_get_pos)
 
-    def set_pos(self, pos):
-        self._pos = max(0, min(pos, self._size - 1))
+def screen_encoding():
+    # the encoding in which curses decodes bytes, i.e. the codeset of LC_CTYPE.
+    # locale.getpreferredencoding() may be utf-8 in the Python's UTF-8 mode even in the C locale.
+    try:
+        encoding = locale.nl_langinfo(locale.CODESET)
+        codecs.lookup(encoding)
+    except (AttributeError, LookupError):
+        encoding = 'ascii'
+    return encoding
+
+
+def cut_to_columns(text, columns, encoding):
+    # type: (bytes, int, str) -> bytes
+    # returns the head of text which fits in the columns when written by curses. the head is a slice of
+    # the given bytes, so byte offsets in it, e.g. of a search match, are kept.
+    # a width is never under-estimated, as a row wider than pad would go to the next row.
+    if _ASCII_NO_TAB.match(text):
+        return text[:columns]
+    col = pos = 0
+    for c in text.decode(encoding, 'plk_escape'):
+        o = ord(c)
+        if c == u'\t':
+            w, n = 8 - col % 8, 1  # curses expands a tab to the next multiple of 8
+        elif o < 0x80:
+            w, n = 1, 1
+        elif 0xdc80 <= o <= 0xdcff:  # an undecodable byte, shown as e.g. '~@' or 'M-x'
+            b = o - 0xdc00
+            w = _UNCTRL_WIDTHS.get(b)
+            if w is None:
+                w = _UNCTRL_WIDTHS[b] = len(curses.unctrl(b))
+            n = 1
+        else:
+            n = len(c.encode(encoding))
+            category = unicodedata.category(c)
+            if unicodedata.east_asian_width(c) in ('W', 'F'):
+                w = 2
+            elif category in ('Mn', 'Me'):
+                w = 0  # combining char
+            elif category in ('Cc', 'Cn'):
+                w = 2  # a C1 control char is shown as e.g. '~@', and an unassigned char may be wide for curses
+            else:
+                w = 1
+        col += w
+        if col > columns:
+            break  # for c
+        pos += n
+    return text[:pos]
+
 
-    def _get_size(self):
-        return self._size
-    size = property(_get_size)
+def find_all(text, word):
+    # type: (bytes, bytes) -> List[int]
+    offsets = []
+    i = text.find(word)
+    while i >= 0:
+        offsets.append(i)
+        i = text.find(word, i + 1)
+    return offsets
 
 
-class SearchState:
+class SearchState(object):
+    __slots__ = ('dir', 'row', 'col', 'word')
+
     def __init__(self, dir, row, col, word):
         self.dir = dir
         self.row = row
@@ -38,143 +200,347 @@ class SearchState:
         self.word = word
 
 
-class Pager:
+_KEYMAP = {  # key code -> name of the handler method, without prefix '_kh_'
+    ord(b'e'): 'down1', ord(b'j'): 'down1', curses.KEY_DOWN: 'down1',
+    ord(b'y'): 'up1', ord(b'k'): 'up1', curses.KEY_UP: 'up1',
+    ord(b'd'): 'down_half',
+    ord(b'u'): 'up_half',
+    ord(b'f'): 'down_page',
+    ord(b'b'): 'up_page',
+    ord(b'G'): 'bottom',
+    ord(b'g'): 'top',
+    ord(b'r'): 'refresh', curses.KEY_REFRESH: 'refresh', curses.KEY_RESIZE: 'refresh',
+    ord(b'q'): 'quit',
+    ord(b'/'): 'search', ord(b'?'): 'search',
+    ord(b'n'): 'search_next', ord(b'N'): 'search_next',
+}
+
+
+class Pager(object):
+    __slots__ = (
+        'content', 'content_pos', 'content_size', 'screen_size', 'screen_pos', 'scr',
+        'pad', 'pad_size', 'pad_width', 'body_height', 'footer_height', 'margin_height',
+        'encoding', 'message', 'search_state', 'debug_log', 'unknown_key_func', 'key_handler', '_kh_table',
+        '_match_cache', '_drawn_rows', '_drawn_top', '_drawn_status', '_status_cache',
+        '_display_cache', '_last_frame',
+    )
+
     def __init__(self):
-        self.content = None  # list of str
-        self.content_csr = None  # Index
+        self.content = None  # LineView
+        self.content_pos = 0  # 0 <= content_pos < content_size  (if content_size > 0)
+        self.content_size = 0
         self.screen_size = None  # YX
-        self.screen_csr = None  # Index
+        self.screen_pos = 0  # 0 <= screen_pos < screen_size.y
         self.scr = None  # screen
         self.pad = None  # off-screen buffer
         self.pad_size = None  # YX
+        self.pad_width = None  # same as pad_size.x
         self.body_height = None  # body_height + footer_height = screen_size.y
         self.footer_height = 1
         self.margin_height = 0  # margin_height < body_height
+        self.encoding = 'ascii'  # of bytes drawn by curses, set by curses_main
         self.message = None
         self.search_state = None
+        self._match_cache = {}  # word -> MatchCache
+        self._drawn_rows = None  # list of keys of the lines drawn in pad, None to redraw all
+        self._drawn_top = None  # content index drawn at the top of pad
+        self._drawn_status = None  # status line drawn in pad
+        self._status_cache = (None, None, b'')  # (pos, size, status line)
+        self._display_cache = {}  # content index -> head of the line, which is long enough to fill pad
+        self._last_frame = None  # what was drawn on screen at the last draw()
         self.debug_log = []  # for debug
 
-        self.unknown_key_func = lambda ch: self.debug_log.append('ch=%d' % ch)
-        self.key_handler = kh = {}
-        kh[ord(b'e')] = kh[ord(b'j')] = kh[curses.KEY_DOWN] = lambda ch: self.move_csr(+1)
-        kh[ord(b'y')] = kh[ord(b'k')] = kh[curses.KEY_UP] = lambda ch: self.move_csr(-1)
-        kh[ord(b'd')] = lambda ch: self.move_csr(self.body_height // 2)
-        kh[ord(b'u')] = lambda ch: self.move_csr(-(self.body_height // 2))
-        kh[ord(b'f')] = lambda ch: self.move_csr(self.body_height)
-        kh[ord(b'b')] = lambda ch: self.move_csr(-self.body_height)
-        kh[ord(b'G')] = lambda ch: self.set_csr(self.content_csr.size)
-        kh[ord(b'g')] = lambda ch: self.set_csr(0)
-        kh[ord(b'r')] = kh[curses.KEY_REFRESH] = kh[curses.KEY_RESIZE] = lambda ch: self.set_screen(self.scr)
-        kh[ord(b'q')] = lambda ch: 'quit'
-        kh[ord(b'/')] = kh[ord(b'?')] = self.do_search_cmd
-        kh[ord(b'n')] = kh[ord(b'N')] = self.do_search_next_cmd
+        self.unknown_key_func = self._log_unknown
+        self.key_handler = {k: getattr(self, '_kh_' + name) for k, name in _KEYMAP.items()}
+        self._kh_table = [None] * (max(self.key_handler) + 1)  # type: List[Any]  # key code -> handler, None for unknown keys
+        for k, func in self.key_handler.items():
+            self._kh_table[k] = func
+
+    def _log_unknown(self, ch):
+        self.debug_log.append('ch=%d' % ch)
+
+    def _kh_down1(self, ch):
+        self.move_csr(+1)
+
+    def _kh_up1(self, ch):
+        self.move_csr(-1)
+
+    def _kh_down_half(self, ch):
+        self.move_csr(self.body_height // 2)
+
+    def _kh_up_half(self, ch):
+        self.move_csr(-(self.body_height // 2))
+
+    def _kh_down_page(self, ch):
+        self.move_csr(self.body_height)
+
+    def _kh_up_page(self, ch):
+        self.move_csr(-self.body_height)
+
+    def _kh_bottom(self, ch):
+        self.set_csr(self.content_size)
+
+    def _kh_top(self, ch):
+        self.set_csr(0)
+
+    def _kh_refresh(self, ch):
+        self.set_screen(self.scr)
+
+    def _kh_quit(self, ch):
+        return 'quit'
+
+    def _kh_search(self, ch):
+        self.do_search_cmd(ch)
+
+    def _kh_search_next(self, ch):
+        self.do_search_next_cmd(ch)
 
     def curses_main(self, stdscr):
         self.scr = scr = stdscr
+        self.encoding = screen_encoding()
         self.set_screen(scr)
         scr.scrollok(False)  # take control of scroll
-        scr.move(0, 0)
 
+        # methods and tables used in every iteration, bound to locals
+        sync_content_size = self._sync_content_size
+        draw = self.draw
+        getch = scr.getch
+        kh_table = self._kh_table
+        kh_table_size = len(kh_table)
+        unknown_key_func = self.unknown_key_func
         request = None
         while request != 'quit':
-            self.draw()
-            ch = scr.getch()  # wait key input
-            func = self.key_handler.get(ch, self.unknown_key_func)
-            request = func(ch)
+            sync_content_size()
+            draw()
+            scr.timeout(-1 if self.content.indexed.is_set() else 100)  # redraw while lines are indexed
+            ch = getch()  # wait key input
+            while ch != -1:
+                sync_content_size()
+                func = kh_table[ch] if ch < kh_table_size else None
+                request = (func or unknown_key_func)(ch)
+                if request == 'quit':
+                    break  # while ch
+                scr.timeout(0)
+                ch = getch()  # keys typed meanwhile, e.g. by a key repeat, are handled before drawing
 
     def set_content(self, content):
+        if not isinstance(content, LineView):  # list of str
+            starts = [0]
+            for line in content:
+                starts.append(starts[-1] + len(line))
+            content = LineView(b''.join(content), starts)
         self.content = content
-        self.content_csr = Index(len(self.content))
+        self.content_pos = 0
+        self.content_size = len(self.content)
         self.search_state = None
-        if self.screen_csr:
-            self._screen_csr_set_pos(self.content_csr.pos)
+        self._match_cache = {}
+        self._display_cache = {}
+        self._drawn_rows = None
+        if self.screen_size is not None:
+            self._set_screen_pos(self.content_pos)
+
+    def _sync_content_size(self):
+        self.content_size = len(self.content)
 
     def set_screen(self, scr):
+        first_setup = self.screen_size is None
         height, width = self.screen_size = YX(*scr.getmaxyx())
-        self.pad = curses.newpad(height, width * 2)
-        self.pad_size = YX(*self.pad.getmaxyx())
+        if self.pad_size != (height, width):  # a pad is reused unless the screen is resized
+            self.pad = curses.newpad(height, width)
+            self.pad_size = YX(*self.pad.getmaxyx())
+            self.pad_width = self.pad_size.x
+            self._display_cache = {}
+        self._drawn_rows = None
+        self._last_frame = None
+        scr.noutrefresh()  # the pad is drawn on top of it, and getch() will not repaint it as it is untouched
 
         self.body_height = max(0, height - self.footer_height)
         self.margin_height = self.body_height // 5
 
-        self.screen_csr = Index(height)
-        self._screen_csr_set_pos(curses.getsyx()[0])
-
-    def _screen_csr_set_pos(self, y):
-        self.screen_csr.set_pos(y)
-        if self.content_csr is None:
+        # the cursor row is kept on refresh or resize, as the cursor of the virtual screen, which getsyx()
+        # returns, is the stale one of scr after the scr.noutrefresh() above, rather than the one of pad
+        self._set_screen_pos(curses.getsyx()[0] if first_setup else self.screen_pos)
+
+    def _set_screen_pos(self, y):
+        # type: (int) -> None
+        # clips with comparison chains rather than calls of max() and min(), as this runs on every move
+        height = self.screen_size.y
+        y = y if y < height - 1 else height - 1
+        y = y if y > 0 else 0
+        if self.content is None:
+            self.screen_pos = y
             return
-        cc = self.content_csr
-        pos = max(0, min(self.screen_csr.pos, cc.size - 1))
-        margin = max(0, min(self.margin_height, cc.pos, cc.size - 1 - cc.pos))
-        self.screen_csr.set_pos(max(margin, min(pos, self.body_height - margin - 1)))
+        size, cp = self.content_size, self.content_pos
+        pos = y if y < size - 1 else size - 1
+        pos = pos if pos > 0 else 0
+        margin = self.margin_height
+        margin = margin if margin < cp else cp
+        margin = margin if margin < size - 1 - cp else size - 1 - cp
+        margin = margin if margin > 0 else 0
+        sp = self.body_height - margin - 1
+        sp = pos if pos < sp else sp
+        sp = sp if sp > margin else margin
+        sp = sp if sp < height - 1 else height - 1
+        self.screen_pos = sp if sp > 0 else 0
 
     def move_csr(self, delta):
-        self.content_csr.set_pos(self.content_csr.pos + delta)
-        self._screen_csr_set_pos(self.screen_csr.pos + delta)
-    
+        size = self.content_size
+        p = self.content_pos + delta
+        p = p if p < size else size - 1
+        self.content_pos = p if p > 0 else 0
+        self._set_screen_pos(self.screen_pos + delta)
+
     def set_csr(self, pos):
-        self.content_csr.set_pos(pos)
-        self._screen_csr_set_pos(pos)
+        size = self.content_size
+        p = pos if pos < size else size - 1
+        self.content_pos = p if p > 0 else 0
+        self._set_screen_pos(pos)
 
     def draw(self):
+        ss = self.search_state
+        frame = (self.pad, self.content_pos, self.screen_pos, self.content_size, self.message,
+                (ss.row, ss.col, ss.word) if ss is not None and ss.col >= 0 else None)
+        if frame == self._last_frame:
+            self.message = None  # already shown, as draw_text_area() would clear it
+            return  # nothing to change on screen, e.g. by an unknown key
+        self._last_frame = frame
+
         self.draw_text_area()
         self.draw_scroll_bar()
-        self.scr.move(self.screen_csr.pos, 0)
+        # the pad goes to the virtual screen directly, without a copy to scr, and takes the cursor with it
+        pad = self.pad
+        pad.move(self.screen_pos, 0)
+        pad.noutrefresh(0, 0, 0, 0, self.screen_size.y - 1, self.screen_size.x - 1)
+        out = sys.stdout.fileno()
+        os.write(out, _SYNC_BEGIN)
+        curses.doupdate()
+        os.write(out, _SYNC_END)
 
     def draw_text_area(self):
-        self.pad.erase()
+        pad = self.pad
+        body_height = self.body_height
+        size = self.content_size
+        top = self.content_pos - self.screen_pos
+        ss = self.search_state
+        highlight_y = ss.row - top if ss is not None and ss.col >= 0 else None
 
-        for y in range(0, self.body_height):
-            self.render_line(y, self.content_csr.pos + (y - self.screen_csr.pos))
+        drawn = self._drawn_rows
+        status_dirty = False
+        if drawn is None:
+            drawn = [-1] * body_height  # -1 does not equal to any key
+            status_dirty = True
+        else:
+            delta = top - self._drawn_top
+            if delta != 0 and abs(delta) < body_height:
+                # only the top moved, so scroll the pad and render the exposed lines
+                pad.scrollok(True)
+                pad.scroll(delta)
+                pad.scrollok(False)
+                if delta > 0:
+                    drawn = drawn[delta:] + [-1] * delta
+                else:
+                    drawn = [-1] * -delta + drawn[:delta]
+                status_dirty = True  # the status line has been scrolled, too
+
+        # a key tells what is drawn in a line, and only the lines of changed keys are rendered
+        # consecutive rows of text are joined and written by a single addstr, each ending with a newline
+        addstr = pad.addstr
+        get_display_text = self._get_display_text
+        run_y, run = 0, []
+        for y in range(0, body_height):
+            ci = top + y
+            if y == highlight_y:
+                key = (ci, ss.col, ss.word)
+            else:
+                key = ci if 0 <= ci < size else None
+            changed = key != drawn[y]
+            if run and (not changed or key is None or y == highlight_y):
+                addstr(run_y, 0, b''.join(run))
+                run = []
+            if changed:
+                if y == highlight_y:
+                    self.render_line_w_search_state(y, ci)
+                elif key is None:
+                    addstr(y, 0, b'~\n', curses.A_DIM)
+                else:
+                    if not run:
+                        run_y = y
+                    run.append(get_display_text(ci))
+                drawn[y] = key
+        if run:
+            addstr(run_y, 0, b''.join(run))
+        self._drawn_rows = drawn
+        self._drawn_top = top
 
         if self.message:
             status_line = b' %s ' % self.message
             self.message = None
         else:
-            status_line = b' [%d / %d] ' % (self.content_csr.pos + 1, self.content_csr.size)
-        self.pad.addstr(self.body_height, 0, status_line, curses.A_REVERSE)
-
-        self.pad.overwrite(self.scr, 0, 0, 0, 0, self.screen_size.y - 1, 
-                self.screen_size.x - 1 - 1)
-                # workaround width - 1 to avoid wide char at eol going head of next line
-
-    def render_line(self, y, content_index):
+            pos = self.content_pos
+            if (pos, size) != self._status_cache[:2]:
+                self._status_cache = (pos, size, b' [%d / %d] ' % (pos + 1, size))
+            status_line = self._status_cache[2]
+        if status_dirty or status_line != self._drawn_status:
+            pad.move(body_height, 0)
+            pad.clrtoeol()
+            pad.addstr(body_height, 0, cut_to_columns(status_line, self.pad_width - 1, self.encoding), curses.A_REVERSE)
+            self._drawn_status = status_line
+
+    def render_line_w_search_state(self, y, content_index):
+        # type: (int, int) -> None
         ss = self.search_state
         pad = self.pad
 
-        pad.move(y, 0) 
-        if ss is None or ss.col < 0 or content_index != ss.row:
-            if 0 <= content_index < self.content_csr.size:
-                pad.addnstr(self.content[content_index], self.pad_size.x);
-            else:
-                pad.addstr(b'~', curses.A_DIM)
-            return
-
-        pad_width = self.pad_size.x
-        text = self.content[content_index]
-        lw = len(ss.word)
-        pad.addnstr(text[:ss.col], pad_width)
-        if ss.col < pad_width:
-            pad.addnstr(text[ss.col:ss.col + lw], pad_width - ss.col, curses.A_REVERSE)
-            if ss.col + lw < pad_width:
-                pad.addnstr(text[ss.col + lw:], pad_width - (ss.col + lw))
+        text = self._get_display_text(content_index)
+        col, lw = ss.col, len(ss.word)
+        # col is a byte offset, which is not a column with wide chars or tabs, so chgat() can not be used
+        pad.addstr(y, 0, text[:col])
+        pad.addstr(text[col:col + lw], curses.A_REVERSE)
+        pad.addstr(text[col + lw:])
+
+    def _get_display_text(self, content_index):
+        # type: (int) -> bytes
+        text = self._display_cache.get(content_index)
+        if text is None:
+            if len(self._display_cache) >= 4 * self.body_height:
+                # drop the lines out of screen, keeping the ones which will be drawn again by a small scroll back
+                top, bh = self.content_pos - self.screen_pos, self.body_height
+                self._display_cache = {i: t for i, t in self._display_cache.items() if top - bh <= i < top + 2 * bh}
+            # 4 bytes per column is enough for any UTF-8 char, and the tail of a long line is never decoded
+            w = self.pad_width - 1  # the last column is for the scroll bar
+            text = self.content.get_head(content_index, w * 4).translate(_CTRL_TABLE)
+            if text.endswith(b'\n'):
+                text = text[:-1]
+            # cut the line not to reach the scroll bar, as a char beyond the edge of pad goes to the next row,
+            # and a newline clears the rest of the row, so no clrtoeol() is needed
+            text = cut_to_columns(text, w, self.encoding) + b'\n'
+            self._display_cache[content_index] = text
+        return text
 
     def draw_scroll_bar(self):
-        cc = self.content_csr
+        pad = self.pad
         w = self.screen_size.x - 1
-        y_begin = (cc.pos - self.screen_csr.pos) * self.body_height // cc.size
-        y_end = (cc.pos + self.body_height - self.screen_csr.pos) * self.body_height // cc.size
-        for y in range(0, self.body_height):
-            if y == y_begin or y_begin <= y < y_end:
-                self.scr.addstr(y, w, b' ', curses.A_REVERSE | curses.A_DIM)
-            else:
-                self.scr.addstr(y, w, b' ')
+        body_height = self.body_height
+        size = max(1, self.content_size)  # an empty content is drawn as if it has a line
+        top = self.content_pos - self.screen_pos
+        y_begin = top * body_height // size
+        y_end = (top + body_height) * body_height // size
+        thumb_begin = max(0, y_begin)
+        thumb_end = max(thumb_begin, min(body_height, max(y_end, y_begin + 1)))
+        space = _ORD_SPACE
+        if thumb_begin > 0:
+            pad.vline(0, w, space, thumb_begin)
+        if thumb_end > thumb_begin:
+            pad.vline(thumb_begin, w, space | curses.A_REVERSE | curses.A_DIM, thumb_end - thumb_begin)
+        if body_height > thumb_end:
+            pad.vline(thumb_end, w, space, body_height - thumb_end)
 
     def input_param(self, prompt):
-        self.scr.addstr(self.body_height, 0, b'%s' % prompt)
+        self._last_frame = None  # the prompt is written to screen directly
+        self.scr.addstr(self.body_height, 0, prompt)
         self.scr.clrtoeol()
 
+        self.scr.timeout(-1)
         curses.echo()
         try:
             s = self.scr.getstr(self.body_height, len(prompt), self.screen_size.x - len(prompt) - 1)
@@ -185,40 +551,121 @@ class Pager:
 
     def do_search_cmd(self, ch):
         self.search_state = None
-        chr_ch = b'%c' % ch
-        w = self.input_param(chr_ch)
+        w = self.input_param(b'%c' % ch)
         if w is None:
             return  # command was cancled
 
-        self.search_state = SearchState(1 if chr_ch == b'/' else -1, self.content_csr.pos, -1, w)
-        self.do_search_next_cmd(ord(b'n'))
+        self.search_state = SearchState(1 if ch == _ORD_SLASH else -1, self.content_pos, -1, w)
+        cache = self._match_cache.get(w) or MatchCache()
+        self._match_cache = {w: cache}
+        if cache.scanned_end < self.content_size and not (cache.scanner and cache.scanner.is_alive()):
+            # a word searched again keeps its cache, and its scan when still running
+            cache.scanner = t = threading.Thread(target=self._precompute_matches, args=(self.content, w, cache))
+            t.daemon = True
+            t.start()
+        self.do_search_next_cmd(_ORD_N)
 
     def do_search_next_cmd(self, ch):
+        # type: (int) -> None
         if self.search_state is None:
             return
 
         ss = self.search_state
-        chr_ch = b'%c' % ch
-        if ss.dir * (1 if chr_ch == b'n' else -1) < 0:
-            ss.row = min(ss.row, self.content_csr.size - 1)
-            while ss.row >= 0:
-                start_pos = len(self.content[ss.row]) if ss.col == -1 else ss.col + len(ss.word) - 1
-                ss.col = self.content[ss.row].rfind(ss.word, 0, start_pos)  # note: expect ss.col = -1 when not found
-                if ss.col >= 0:
+        word = ss.word
+        cache = self._match_cache.setdefault(word, MatchCache())
+        get_match_offsets = self._get_match_offsets
+        if ss.dir * (1 if ch == _ORD_N else -1) < 0:
+            find_row = self._find_row_backward
+            row, col = min(ss.row, self.content_size - 1), ss.col
+            while row >= 0:
+                offsets = get_match_offsets(cache, row, word)
+                i = (len(offsets) if col == -1 else bisect_left(offsets, col)) - 1
+                col = offsets[i] if i >= 0 else -1
+                if col >= 0:
                     break  # while
-                ss.row -= 1
+                row = find_row(row - 1, word, cache)
         else:
-            ss.row = max(0, ss.row)
-            while ss.row < self.content_csr.size:
-                ss.col = self.content[ss.row].find(ss.word, ss.col + 1)  # note: expect ss.col = -1 when not found
-                if ss.col >= 0:
+            find_row = self._find_row_forward
+            row, col = max(0, ss.row), ss.col
+            while row < self.content_size:  # may grow while find_row waits for the index
+                offsets = get_match_offsets(cache, row, word)
+                i = bisect_right(offsets, col)
+                col = offsets[i] if i < len(offsets) else -1
+                if col >= 0:
                     break  # while
-                ss.row += 1
+                row = find_row(row + 1, word, cache)
+        ss.row, ss.col = row, col
         if ss.col >= 0:  # found
             self.set_csr(ss.row)
         else:
             self.message = b'not found'
 
+    def _find_row_forward(self, row, word, cache):
+        # type: (int, bytes, MatchCache) -> int
+        scanned_end = cache.scanned_end
+        if row < scanned_end:
+            i = bisect_left(cache.rows, row)
+            if i < len(cache.rows):
+                return cache.rows[i]
+            row = scanned_end
+
+        # skip the rows without the word by a single find over the whole content, including lines not indexed yet
+        content = self.content
+        starts = content.starts
+        hit = content.buf.find(word, starts[row])
+        if hit < 0:
+            return self.content_size
+        if hit >= starts[-1] and not content.indexed.is_set():
+            content.indexed.wait()  # the row of the hit is known only when indexed
+            self._sync_content_size()
+        return bisect_right(starts, hit) - 1
+
+    def _find_row_backward(self, row, word, cache):
+        # type: (int, bytes, MatchCache) -> int
+        if row < 0:
+            return -1
+        if row < cache.scanned_end:
+            i = bisect_right(cache.rows, row) - 1
+            return cache.rows[i] if i >= 0 else -1
+
+        starts = self.content.starts
+        hit = self.content.buf.rfind(word, 0, starts[row + 1])
+        if hit < 0:
+            return -1
+        return bisect_right(starts, hit) - 1
+
+    def _get_match_offsets(self, cache, row, word):
+        # type: (MatchCache, int, bytes) -> List[int]
+        offsets = cache.offsets.get(row)
+        if offsets is None:
+            offsets = find_all(self.content[row], word)
+            if offsets:  # rows without any match are not cached, to keep the cache small
+                cache.offsets[row] = offsets
+        return offsets
+
+    def _precompute_matches(self, content, word, cache):
+        # type: (LineView, bytes, MatchCache) -> None
+        # runs in a background thread, while the main thread mostly waits for key input.
+        # each find is limited to a chunk, not to hold GIL for long time.
+        content.indexed.wait()
+        buf, starts = content.buf, content.starts
+        buf_len = len(buf)
+        pos = starts[cache.scanned_end]
+        while pos < buf_len:
+            if self.content is not content or self._match_cache.get(word) is not cache:
+                return  # content was changed or another word is searched
+            chunk_end = min(pos + _SEARCH_CHUNK, buf_len)
+            hit = buf.find(word, pos, chunk_end + len(word) - 1)  # a match starting in the chunk
+            if hit < 0:
+                pos = chunk_end
+                cache.scanned_end = bisect_right(starts, pos) - 1
+                continue  # while
+            row = bisect_right(starts, hit) - 1
+            if buf.find(word, hit, starts[row + 1]) >= 0:  # a match across lines does not count
+                cache.rows.append(row)  # the offsets are found when n/N lands on the row
+            cache.scanned_end = row + 1
+            pos = starts[row + 1]
+
 
 def wrapper(curses_main, *args):  # same as curses.wrapper, except for not setting up color pallet
     scr = curses.initscr()
@@ -240,7 +687,6 @@ def main(argv):
 Usage: {argv0} <input>
 """.format(argv0=argv[0])
 
-    import locale
     locale.setlocale(locale.LC_ALL, "")  # enable printing wide chars.
 
     input_file = None
@@ -257,15 +703,13 @@ Usage: {argv0} <input>
             else:
                 sys.exit('too many command-line arguments')
 
-    with open(input_file, 'rb') as inp:
-        lines = inp.readlines()
-
     pgr = Pager()
-    pgr.set_content(lines)
+    pgr.set_content(load_content(input_file))
     pgr.message = b' %s ' % (input_file if sys.version_info[0] < 3 else input_file.encode('utf-8'))
     try:
         wrapper(pgr.curses_main)
     except:
+        import traceback  # only needed on an error
         sys.stderr.write(traceback.format_exc())
     finally:
         if pgr.debug_log: